@@ -1,24 +1,377 @@
+import functools
+import hashlib
+import io
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import pm4py
+import pyarrow as pa
+import pyarrow.csv as pcsv
 import streamlit as st
-from pm4py.objects.conversion.log import converter as log_converter
+import xxhash
+from kernels import gap_stats
 from pm4py.visualization.petri_net import visualizer as pn_visualizer
-from pm4py.statistics.traces.generic.log import case_statistics
 from pm4py.visualization.graphs import visualizer as graphs_visualizer
 from datetime import datetime
 
+
+# --------------------------------------------------
+# Cached pipeline stages
+# --------------------------------------------------
+# Streamlit re-runs this whole script on every widget interaction, so each
+# expensive stage lives in a cached function. DataFrames go through
+# st.cache_data; PM4Py objects (Petri nets) go through
+# st.cache_resource since they are expensive to hash and copy. Arguments
+# prefixed with "_" are skipped by Streamlit's hasher, so those functions
+# take `log_key` (file hash + column mapping) as the actual cache key.
+
+
+ISO_FORMATS = (
+    '%Y-%m-%d %H:%M:%S.%f',
+    '%Y-%m-%dT%H:%M:%S.%f',
+    '%Y-%m-%d %H:%M:%S',
+    '%Y-%m-%dT%H:%M:%S',
+    '%Y-%m-%d %H:%M',
+    '%Y-%m-%dT%H:%M',
+    '%Y-%m-%d',
+)
+
+
+def _guess_iso_format(value):
+    """Return the ISO-8601 format `value` matches, or None to let pandas infer."""
+    for fmt in ISO_FORMATS:
+        try:
+            datetime.strptime(str(value), fmt)
+            return fmt
+        except ValueError:
+            continue
+    return None
+
+
+def _fast_df_hash(df):
+    """xxh3 fingerprint of a DataFrame's column names and values."""
+    h = xxhash.xxh3_64()
+    for col in df.columns:
+        h.update(str(col).encode())
+        h.update(pd.util.hash_pandas_object(df[col], index=False).values.tobytes())
+    return h.digest()
+
+
+# Streamlit's default hashing of large DataFrames is the main cost of a
+# cache lookup; xxh3 brings it down to memory bandwidth. Uploaded bytes
+# can't be hooked this way (Streamlit hashes raw bytes before consulting
+# hash_funcs), so they are passed unhashed alongside their xxh3 `file_key`.
+HASH_FUNCS = {pd.DataFrame: _fast_df_hash}
+
+# Discovered Petri nets persisted across sessions / restarts
+PNML_CACHE_DIR = Path.home() / '.cache' / 'pmdash'
+
+
+def parquet_cache_path(file_key):
+    """Temp-dir Parquet copy of a CSV / Excel upload, named after its content hash."""
+    return os.path.join(tempfile.gettempdir(), f"pm_{file_key}.parquet")
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def load_df(_file_bytes, file_key, name):
+    """Parse the uploaded CSV / Excel / Parquet file contents into a DataFrame.
+
+    CSV and Excel uploads are also written to a Parquet file in the temp
+    directory (named after the content hash), so a later cache miss on the
+    same file reads typed columnar data instead of re-parsing text / XML.
+    """
+    if name.endswith('.parquet'):
+        return pd.read_parquet(io.BytesIO(_file_bytes))
+
+    path = parquet_cache_path(file_key)
+    if os.path.exists(path):
+        return pd.read_parquet(path)
+
+    if name.endswith('.csv'):
+        # Multi-threaded Arrow parser; fall back to the C parser for files it rejects
+        try:
+            df = pd.read_csv(io.BytesIO(_file_bytes), engine='pyarrow')
+        except ValueError:
+            df = pd.read_csv(io.BytesIO(_file_bytes))
+    else:
+        df = pd.read_excel(io.BytesIO(_file_bytes), engine='calamine')
+
+    # Best effort: columns Parquet can't represent (e.g. mixed types) just
+    # mean this file is parsed again next time
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp_path, compression='zstd')
+        os.replace(tmp_path, path)
+    except (OSError, ValueError, TypeError, NotImplementedError):
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def prepare_df(_file_bytes, file_key, name, case_col, act_col, ts_col, ts_format=None):
+    """Map the selected columns to PM4Py names, clean and filter the log."""
+    columns = [case_col, act_col, ts_col]
+    path = parquet_cache_path(file_key)
+    if not name.endswith('.parquet') and os.path.exists(path):
+        # load_df already left a typed Parquet copy: read just the mapped columns
+        df = pd.read_parquet(path, columns=columns)
+    elif name.endswith('.csv'):
+        # Cold path (the Parquet copy could not be written): re-read only the
+        # mapped columns, in chunks, with the id columns as categoricals and
+        # timestamps parsed by the reader itself
+        reader = pd.read_csv(io.BytesIO(_file_bytes),
+                             usecols=columns,
+                             dtype={case_col: 'category', act_col: 'category'},
+                             parse_dates=[ts_col],
+                             date_format=ts_format,
+                             chunksize=200_000)
+        chunks = list(reader)
+        df = pd.concat(chunks, ignore_index=True)
+        # concat falls back to object dtype when chunk categories differ
+        for col in (case_col, act_col):
+            df[col] = union_categoricals([chunk[col] for chunk in chunks])
+    else:
+        df = load_df(_file_bytes, file_key, name)[columns]
+
+    # Arrow date / timestamp columns (Parquet uploads, older cache files)
+    # pass the datetime check below, but pm4py needs numpy datetime64
+    ts_dtype = df[ts_col].dtype
+    if isinstance(ts_dtype, pd.ArrowDtype) and (pa.types.is_date(ts_dtype.pyarrow_dtype)
+                                                or pa.types.is_timestamp(ts_dtype.pyarrow_dtype)):
+        df[ts_col] = pd.to_datetime(df[ts_col])
+
+    # Convert timestamp column to datetime if it's not already (CSV columns
+    # were normally parsed by read_csv already). An explicit format is much
+    # faster than per-value inference, so guess one from the first value.
+    if not pd.api.types.is_datetime64_any_dtype(df[ts_col]):
+        probe = df[ts_col].dropna()
+        fmt = ts_format or (_guess_iso_format(probe.iloc[0]) if len(probe) else None)
+        try:
+            df[ts_col] = pd.to_datetime(df[ts_col], format=fmt, cache=True)
+        except ValueError:
+            if ts_format or fmt is None:
+                raise
+            # The guessed format does not fit every row
+            df[ts_col] = pd.to_datetime(df[ts_col], cache=True)
+
+    # Rename columns to PM4Py standard
+    df = df.rename(columns={
+        case_col: 'case:concept:name',
+        act_col: 'concept:name',
+        ts_col: 'time:timestamp'
+    })
+
+    # Data cleaning and preprocessing
+    df = pm4py.format_dataframe(df,
+                                case_id='case:concept:name',
+                                activity_key='concept:name',
+                                timestamp_key='time:timestamp')
+
+    # Filter cases with at least 2 events
+    df = pm4py.filter_case_size(df, 2, None)
+
+    # format_dataframe casts ids to strings; store them as categoricals once
+    # so every later groupby / isin / sort works on integer codes
+    for col in ('case:concept:name', 'concept:name'):
+        df[col] = df[col].astype('category').cat.remove_unused_categories()
+    return df
+
+
+def to_pm4py(df):
+    """pm4py only accepts string-typed case / activity columns, not categoricals."""
+    return df.astype({'case:concept:name': 'string', 'concept:name': 'string'})
+
+
+def discover_persisted(df, model_key):
+    """Inductive-miner discovery backed by a PNML file cache on disk.
+
+    Second tier under the in-memory caches: the same log (and mapping /
+    variant, all part of `model_key`) uploaded again in a new session or
+    after a restart is read back instead of re-discovered.
+    """
+    path = PNML_CACHE_DIR / f"{hashlib.sha256(repr(model_key).encode()).hexdigest()}.pnml"
+    if path.exists():
+        try:
+            return pm4py.read_pnml(str(path))
+        except Exception:
+            # Unreadable / truncated file: treat as a cache miss and rewrite it
+            path.unlink(missing_ok=True)
+
+    net, initial_marking, final_marking = pm4py.discover_petri_net_inductive(to_pm4py(df))
+
+    # Best effort. Sessions share one server process (and per-variant
+    # discovery has no per-key lock), so each writer gets its own unique
+    # temp file; write_pnml needs the .pnml suffix on it too
+    tmp_path = None
+    try:
+        PNML_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=PNML_CACHE_DIR, suffix='.pnml', delete=False) as tmp:
+            tmp_path = Path(tmp.name)
+        pm4py.write_pnml(net, initial_marking, final_marking, str(tmp_path))
+        os.replace(tmp_path, path)
+    except OSError:
+        if tmp_path is not None:
+            tmp_path.unlink(missing_ok=True)
+    return net, initial_marking, final_marking
+
+
+@st.cache_resource
+def discover_model(_df, log_key):
+    """Discover a Petri net with the inductive miner."""
+    return discover_persisted(_df, log_key)
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def compute_activity_table(_df, log_key):
+    """Per-activity frequency and inter-event timing statistics."""
+    s = _df.sort_values(['case:concept:name', 'time:timestamp'])
+    case = s['case:concept:name'].cat.codes.to_numpy()
+    act = s['concept:name']
+    act_codes = act.cat.codes.to_numpy()
+    n_act = len(act.cat.categories)
+
+    # Get basic frequency counts
+    counts = np.bincount(act_codes, minlength=n_act)
+    pct = counts * (100.0 / counts.sum())
+
+    # Time since the previous event of the same case, attributed to the
+    # later activity (the first event of a case has no gap)
+    ts = s['time:timestamp'].to_numpy(dtype='datetime64[ns]').view('int64')
+    mn, mx, sm, cn = gap_stats(case, act_codes, ts, n_act)
+    sampled = cn > 0
+
+    # Create DataFrame with all metrics
+    activity_df = pd.DataFrame({
+        'Activity': act.cat.categories,
+        'Count': counts,
+        'Percentage (%)': pct.round(2),
+        'Min Duration (hours)': (np.where(sampled, mn, 0) / 3600).round(2),
+        'Avg Duration (hours)': (np.divide(sm, cn, out=np.zeros_like(sm), where=sampled) / 3600).round(2),
+        'Max Duration (hours)': (mx / 3600).round(2),
+        'Sample Size': cn  # Added to show how many duration measurements we have
+    })
+
+    return activity_df.sort_values('Count', ascending=False, kind='stable')
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def compute_case_variants(_df, log_key):
+    """One row per case: its variant (activity tuple) and first-to-last duration."""
+    s = _df.sort_values('time:timestamp', kind='stable')
+    g = s.assign(act_code=s['concept:name'].cat.codes).groupby('case:concept:name', sort=False, observed=True)
+
+    # Build variants from activity codes, then map each distinct one to names
+    variant_codes = g['act_code'].apply(tuple)
+    # Index a plain ndarray: indexing the categories Index per variant is slow
+    categories = _df['concept:name'].cat.categories.to_numpy()
+    names = {v: tuple(categories[list(v)]) for v in variant_codes.unique()}
+
+    return pd.DataFrame({
+        'variant': variant_codes.map(names),
+        'dur': (g['time:timestamp'].last() - g['time:timestamp'].first()).dt.total_seconds(),
+    })
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def compute_case_stats(_df, log_key):
+    """Average / min / max case duration in seconds, or None for an empty log."""
+    durations = compute_case_variants(_df, log_key)['dur'].to_numpy(dtype=np.float64)
+    if not durations.size:
+        return None
+    return durations.mean(), durations.min(), durations.max()
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def compute_variants(_df, log_key):
+    """Variant frequency and average case duration per variant."""
+    case_df = compute_case_variants(_df, log_key)
+
+    variants_df = (case_df.groupby('variant')
+                   .agg(Count=('dur', 'size'), AvgDur=('dur', 'mean'))
+                   .reset_index())
+    variants_df['Variant'] = variants_df['variant'].map(lambda v: ' → '.join(v))
+    variants_df['Avg Duration (hours)'] = (variants_df['AvgDur'] / 3600).round(2)
+
+    # 'variant' keeps the activity tuple for lookups; it is not displayed
+    return variants_df[['Variant', 'Count', 'Avg Duration (hours)', 'variant']].sort_values('Count', ascending=False)
+
+
+@st.cache_resource
+def variant_model_cache(_df, log_key):
+    """Return a memoized `variant tuple -> (net, im, fm)` discovery function.
+
+    The case ids of every variant are collected once; the sub-log for a
+    variant is cut from the DataFrame with a boolean mask only when it is
+    first selected, and the discovered net is kept in an LRU cache so
+    re-selecting a variant skips discovery.
+    """
+    case_df = compute_case_variants(_df, log_key)
+    cases_by_variant = case_df.groupby('variant').groups
+
+    @functools.lru_cache(maxsize=64)
+    def discover(variant):
+        filtered_df = _df[_df['case:concept:name'].isin(cases_by_variant[variant])]
+        return discover_persisted(filtered_df, (log_key, variant))
+
+    return discover
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def compute_perf_dfg(_df, log_key):
+    """Mean waiting time between directly-following activities."""
+    s = _df.sort_values(['case:concept:name', 'time:timestamp'])
+    g = s.groupby('case:concept:name', sort=False)
+    s = s.assign(
+        next_act=g['concept:name'].shift(-1),
+        gap=g['time:timestamp'].diff(-1).dt.total_seconds().abs(),
+    )
+
+    perf_df = (s.dropna(subset=['next_act'])
+                .groupby(['concept:name', 'next_act'])['gap']
+                .mean()
+                .reset_index())
+
+    # Keep only transitions with a measurable waiting time
+    perf_df = perf_df[perf_df['gap'] > 0]
+    perf_df = pd.DataFrame({
+        'From': perf_df['concept:name'],
+        'To': perf_df['next_act'],
+        'Avg Time (hours)': (perf_df['gap'] / 3600).round(2),
+    })
+    return perf_df.sort_values('Avg Time (hours)', ascending=False)
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def render_net(_net, _initial_marking, _final_marking, model_key):
+    """Render a Petri net to PNG bytes in memory (no temp file on disk)."""
+    gviz = pn_visualizer.apply(_net, _initial_marking, _final_marking)
+    return gviz.pipe(format='png')
+
+
+@st.cache_data(hash_funcs=HASH_FUNCS)
+def convert_df_to_csv(df):
+    # Arrow writes UTF-8 bytes directly, without an intermediate Python str
+    buf = io.BytesIO()
+    pcsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), buf)
+    return buf.getvalue()
+
+
 st.title("Dynamic Process Mining Dashboard")
 
-# Upload CSV or Excel file
-uploaded_file = st.file_uploader("Upload Event Log", type=["csv", "xlsx"])
+# Upload CSV, Excel or Parquet file
+uploaded_file = st.file_uploader("Upload Event Log", type=["csv", "xlsx", "parquet"])
 
 if uploaded_file:
     try:
-        # Read file
-        if uploaded_file.name.endswith('.csv'):
-            df = pd.read_csv(uploaded_file)
-        else:
-            df = pd.read_excel(uploaded_file, engine='openpyxl')
+        # Read file; hash the bytes once per rerun and key every cache on that
+        file_bytes = uploaded_file.getvalue()
+        file_key = xxhash.xxh3_128_hexdigest(file_bytes)
+        df = load_df(file_bytes, file_key, uploaded_file.name)
 
         # Display the uploaded data
         st.write("Uploaded Data Preview:", df.head())
@@ -28,209 +381,123 @@ if uploaded_file:
         case_id_col = st.selectbox("Select Case ID Column", df.columns)
         activity_col = st.selectbox("Select Activity Column", df.columns)
         timestamp_col = st.selectbox("Select Timestamp Column", df.columns)
+        timestamp_format = st.text_input("Timestamp Format (optional)", placeholder="%Y-%m-%d %H:%M:%S") or None
 
-        # Convert timestamp column to datetime if it's not already
-        if not pd.api.types.is_datetime64_any_dtype(df[timestamp_col]):
-            df[timestamp_col] = pd.to_datetime(df[timestamp_col])
+        # Cache key for everything derived from this file + mapping
+        log_key = (file_key, case_id_col, activity_col, timestamp_col, timestamp_format)
 
-        # Rename columns to PM4Py standard
-        df = df.rename(columns={
-            case_id_col: 'case:concept:name',
-            activity_col: 'concept:name',
-            timestamp_col: 'time:timestamp'
-        })
+        df = prepare_df(file_bytes, file_key, uploaded_file.name, case_id_col, activity_col, timestamp_col, timestamp_format)
 
-        # Data cleaning and preprocessing
-        df = pm4py.format_dataframe(df, 
-                                  case_id='case:concept:name',
-                                  activity_key='concept:name',
-                                  timestamp_key='time:timestamp')
-
-        # Filter cases with at least 2 events
-        df = pm4py.filter_case_size(df, 2, None)
-
-        # Convert to event log
-        event_log = log_converter.apply(df, variant=log_converter.Variants.TO_EVENT_LOG)
+        # Only the selected tab's body runs (on_change="rerun" makes Streamlit
+        # track the active tab), so unopened sections cost nothing per rerun
+        (model_tab, perf_tab, activity_tab,
+         variants_tab, drill_tab, bottleneck_tab) = st.tabs(
+            ["🔍 Model", "⏱️ Performance", "📊 Activities", "🔄 Variants", "🔍 Variant Drill-down", "🐢 Bottlenecks"],
+            key="section",
+            on_change="rerun",
+        )
 
         # --------------------------------------------------
         # 1. Process Model Visualization
         # --------------------------------------------------
-        st.subheader("🔍 Process Model")
-        net, initial_marking, final_marking = pm4py.discover_petri_net_inductive(event_log)
-        gviz = pn_visualizer.apply(net, initial_marking, final_marking)
-        pn_visualizer.save(gviz, "process_model.png")
-        st.image("process_model.png", caption="Discovered Process Model")
+        with model_tab:
+            if model_tab.open:
+                st.subheader("🔍 Process Model")
+                net, initial_marking, final_marking = discover_model(df, log_key)
+                st.image(render_net(net, initial_marking, final_marking, log_key), caption="Discovered Process Model")
 
         # --------------------------------------------------
         # 2. Key Performance Metrics
         # --------------------------------------------------
-        st.subheader("⏱️ Performance Statistics")
-        
-        # Case duration statistics
-        case_durations = case_statistics.get_all_case_durations(event_log)
-        avg_duration = sum(case_durations) / len(case_durations) if case_durations else 0
-        
-        col1, col2, col3 = st.columns(3)
-        col1.metric("Avg Case Duration", f"{round(avg_duration/3600, 2)} hours")
-        col2.metric("Min Case Duration", f"{round(min(case_durations)/3600, 2)} hours" if case_durations else "N/A")
-        col3.metric("Max Case Duration", f"{round(max(case_durations)/3600, 2)} hours" if case_durations else "N/A")
+        with perf_tab:
+            if perf_tab.open:
+                st.subheader("⏱️ Performance Statistics")
+
+                # Case duration statistics
+                case_stats = compute_case_stats(df, log_key)
+                avg_duration, min_duration, max_duration = case_stats if case_stats else (0, None, None)
+
+                col1, col2, col3 = st.columns(3)
+                col1.metric("Avg Case Duration", f"{round(avg_duration/3600, 2)} hours")
+                col2.metric("Min Case Duration", f"{round(min_duration/3600, 2)} hours" if case_stats else "N/A")
+                col3.metric("Max Case Duration", f"{round(max_duration/3600, 2)} hours" if case_stats else "N/A")
 
         # --------------------------------------------------
         # 3. Activity Frequency and Timing Analysis
         # --------------------------------------------------
-        st.subheader("📊 Activity Frequency and Timing Analysis")
-        
-        # Get basic frequency counts
-        activity_counts = pm4py.get_event_attribute_values(event_log, "concept:name")
-        
-        # Initialize dictionary to store timing information
-        activity_timing = {}
-        
-        # Calculate timing statistics for each activity
-        for trace in event_log:
-            previous_event = None
-            
-            # Sort events in trace by timestamp to ensure correct order
-            sorted_events = sorted(trace, key=lambda x: x['time:timestamp'])
-            
-            for event in sorted_events:
-                activity = event['concept:name']
-                if activity not in activity_timing:
-                    activity_timing[activity] = {'durations': []}
-                
-                # Calculate duration from previous activity (if exists)
-                if previous_event is not None:
-                    duration = (event['time:timestamp'] - previous_event['time:timestamp']).total_seconds()
-                    activity_timing[activity]['durations'].append(duration)
-                
-                previous_event = event
-        
-        # Create DataFrame with all metrics
-        activity_data = []
-        for activity in activity_counts.keys():
-            durations = activity_timing[activity]['durations']
-            
-            activity_data.append({
-                'Activity': activity,
-                'Count': activity_counts[activity],
-                'Percentage (%)': round(activity_counts[activity] / sum(activity_counts.values()) * 100, 2),
-                'Min Duration (hours)': round(min(durations)/3600, 2) if durations else 0,
-                'Avg Duration (hours)': round(sum(durations)/len(durations)/3600, 2) if durations else 0,
-                'Max Duration (hours)': round(max(durations)/3600, 2) if durations else 0,
-                'Sample Size': len(durations)  # Added to show how many duration measurements we have
-            })
-        
-        activity_df = pd.DataFrame(activity_data).sort_values('Count', ascending=False)
-
-        # Display bar chart for frequency
-        st.bar_chart(activity_df.set_index('Activity')['Count'])
-        
-        # Display comprehensive table
-        st.subheader("Activity Details Table")
-        st.dataframe(activity_df, hide_index=True)
-        
-        # Add download button
-        @st.cache_data
-        def convert_df_to_csv(df):
-            return df.to_csv(index=False).encode('utf-8')
-        
-        csv = convert_df_to_csv(activity_df)
-        st.download_button(
-            label="📥 Download Activity Analysis Data",
-            data=csv,
-            file_name="activity_analysis.csv",
-            mime="text/csv",
-        )
+        with activity_tab:
+            if activity_tab.open:
+                st.subheader("📊 Activity Frequency and Timing Analysis")
+
+                activity_df = compute_activity_table(df, log_key)
+
+                # Display bar chart for frequency
+                st.bar_chart(activity_df.set_index('Activity')['Count'])
+
+                # Display comprehensive table
+                st.subheader("Activity Details Table")
+                st.dataframe(activity_df, hide_index=True)
+
+                # Add download button
+                csv = convert_df_to_csv(activity_df)
+                st.download_button(
+                    label="📥 Download Activity Analysis Data",
+                    data=csv,
+                    file_name="activity_analysis.csv",
+                    mime="text/csv",
+                )
 
         # --------------------------------------------------
         # 4. Process Variants (with Average Duration)
         # --------------------------------------------------
-        st.subheader("🔄 Process Variants")
-        
-        # Get variants using current PM4Py API
-        variants = pm4py.get_variants_as_tuples(event_log)
-        
-        variant_stats = []
-        for variant, traces in variants.items():
-            variant_durations = []
-            for trace in traces:
-                # Get the first and last event timestamps for the trace
-                events = list(filter(lambda x: 'time:timestamp' in x, trace))
-                if len(events) > 1:
-                    start_time = events[0]['time:timestamp']
-                    end_time = events[-1]['time:timestamp']
-                    duration = (end_time - start_time).total_seconds()
-                    variant_durations.append(duration)
-            
-            avg_duration = sum(variant_durations) / len(variant_durations) if variant_durations else 0
-            variant_stats.append({
-                'Variant': ' → '.join(variant),
-                'Count': len(traces),
-                'Avg Duration (hours)': round(avg_duration / 3600, 2)
-            })
-
-        variants_df = pd.DataFrame(variant_stats).sort_values('Count', ascending=False)
-        
-        # Display all variants (not just top 10)
-        st.dataframe(variants_df, hide_index=True)
+        with variants_tab:
+            if variants_tab.open:
+                st.subheader("🔄 Process Variants")
+
+                variants_df = compute_variants(df, log_key)
+
+                # Display all variants (not just top 10)
+                st.dataframe(variants_df.drop(columns='variant'), hide_index=True)
 
         # --------------------------------------------------
         # 5. Visualize Each Variant in the Process Model
         # --------------------------------------------------
-        st.subheader("🔍 Visualize Each Variant in the Process Model")
-        
-        # Allow user to select a variant
-        selected_variant = st.selectbox("Select a Variant", variants_df['Variant'].tolist())
-        
-        # Filter event log for the selected variant
-        filtered_log = pm4py.filter_variants(event_log, [tuple(selected_variant.split(' → '))])
-        
-        # Discover Petri net for the selected variant
-        net, initial_marking, final_marking = pm4py.discover_petri_net_inductive(filtered_log)
-        gviz = pn_visualizer.apply(net, initial_marking, final_marking)
-        pn_visualizer.save(gviz, "variant_process_model.png")
-        st.image("variant_process_model.png", caption=f"Process Model for Variant: {selected_variant}")
+        with drill_tab:
+            if drill_tab.open:
+                st.subheader("🔍 Visualize Each Variant in the Process Model")
+
+                variants_df = compute_variants(df, log_key)
+
+                # Allow user to select a variant (options are the tuples, shown joined)
+                selected_variant = st.selectbox("Select a Variant", variants_df['variant'].tolist(), format_func=' → '.join)
+
+                # Discover (or reuse) the Petri net for the selected variant
+                discover_variant_model = variant_model_cache(df, log_key)
+                net, initial_marking, final_marking = discover_variant_model(selected_variant)
+                png = render_net(net, initial_marking, final_marking, (log_key, selected_variant))
+                st.image(png, caption=f"Process Model for Variant: {' → '.join(selected_variant)}")
 
         # --------------------------------------------------
         # 6. Bottleneck Analysis (Improved)
         # --------------------------------------------------
-        st.subheader("🐢 Bottleneck Analysis")
-        
-        # Get performance DFG (returns tuple: frequency_dfg, performance_dfg)
-        perf_dfg = pm4py.discover_performance_dfg(event_log)
-        mean_times = perf_dfg[1]  # Access the PERFORMANCE metrics
-
-        performance_data = []
-        for key, time_info in mean_times.items():
-            # PM4Py returns performance metrics as dictionary for intervals
-            if isinstance(time_info, dict):
-                avg_time = time_info.get('mean', 0)
-            else:  # Handle legacy format
-                avg_time = time_info
-            
-            # Ensure numeric value and filter valid entries
-            if isinstance(avg_time, (int, float)) and avg_time > 0:
-                performance_data.append({
-                    'From': key[0],  # First activity
-                    'To': key[1],    # Second activity
-                    'Avg Time (hours)': round(avg_time / 3600, 2)
-                })
-
-        if performance_data:
-            perf_df = pd.DataFrame(performance_data)
-            perf_df = perf_df.sort_values('Avg Time (hours)', ascending=False)
-            
-            # Display bottleneck analysis with explanation
-            st.write("Bottleneck Analysis identifies transitions between activities with the longest average durations.")
-            st.dataframe(perf_df, hide_index=True)
-            
-            # Visualize bottleneck transitions
-            st.write("### Bottleneck Transitions")
-            st.write("The following transitions take the longest time:")
-            for _, row in perf_df.head(5).iterrows():
-                st.write(f"- **{row['From']} → {row['To']}**: {row['Avg Time (hours)']} hours")
-        else:
-            st.warning("No valid performance data available for bottleneck analysis")
+        with bottleneck_tab:
+            if bottleneck_tab.open:
+                st.subheader("🐢 Bottleneck Analysis")
+
+                perf_df = compute_perf_dfg(df, log_key)
+
+                if not perf_df.empty:
+                    # Display bottleneck analysis with explanation
+                    st.write("Bottleneck Analysis identifies transitions between activities with the longest average durations.")
+                    st.dataframe(perf_df, hide_index=True)
+
+                    # Visualize bottleneck transitions
+                    st.write("### Bottleneck Transitions")
+                    st.write("The following transitions take the longest time:")
+                    for _, row in perf_df.nlargest(5, 'Avg Time (hours)').iterrows():
+                        st.write(f"- **{row['From']} → {row['To']}**: {row['Avg Time (hours)']} hours")
+                else:
+                    st.warning("No valid performance data available for bottleneck analysis")
 
         st.success("All process mining metrics generated successfully!")
 
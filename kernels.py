@@ -0,0 +1,33 @@
+"""Numba kernels for the dashboard.
+
+Kept out of dashboard.py on purpose: Numba's on-disk cache re-imports the
+defining module when it loads a compiled function, and importing the
+Streamlit script would re-run the whole app.
+"""
+import numpy as np
+from numba import njit
+
+
+@njit(cache=True)
+def gap_stats(case, act, ts, n_act):
+    """Min / max / sum / count of inter-event gaps (seconds) per activity.
+
+    Expects events sorted by case then timestamp; `case` and `act` are
+    integer codes and `ts` nanosecond timestamps.
+    """
+    mn = np.full(n_act, np.inf)
+    mx = np.zeros(n_act)
+    sm = np.zeros(n_act)
+    cn = np.zeros(n_act, np.int64)
+    for i in range(1, case.size):
+        if case[i] != case[i - 1]:
+            continue
+        d = (ts[i] - ts[i - 1]) * 1e-9
+        a = act[i]
+        if d < mn[a]:
+            mn[a] = d
+        if d > mx[a]:
+            mx[a] = d
+        sm[a] += d
+        cn[a] += 1
+    return mn, mx, sm, cn